@@ -1,32 +1,131 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import glob
+import numpy as np
+import pyarrow.parquet as pq
+import fnmatch
+import hashlib
+import json
 import os
 import re
+import tempfile
 from datetime import datetime
 
+# python-calamine (optional) parses xlsx several times faster than openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
 st.set_page_config(page_title="SRJ Peety Steels Private Limited Pipe Stock Search Tool", layout="wide")
 
 DATA_FOLDER = "data"
 PIPE_MASS_FILE = os.path.join(DATA_FOLDER, "pipe_mass.xlsx")  # fixed file
+PIPE_MASS_PARQUET = os.path.join(DATA_FOLDER, "pipe_mass.parquet")  # optional, from scripts/build_pipe_mass.py
+PIPE_MASS_SOURCE_KEY = b"pipe_mass_source"  # Parquet metadata: {"mtime", "size"} of the xlsx it was built from
+MERGED_CACHE_FOLDER = os.path.join(DATA_FOLDER, ".cache")  # Parquet copies of the prepared long frame
+MERGED_CACHE_VERSION = 6  # bump when build_merged's output changes so old cache files are ignored
+STYLE_MAX_ROWS = 300  # larger results skip row colours: the Styler costs ~0.14 ms/row per render vs <1 ms total unstyled
+AVAILABILITY_STYLES = {
+    "✅ Available": 'background-color: #d4edda',
+    "⚠️ Low Stock": 'background-color: #fff3cd',
+    "❌ Not Available": 'background-color: #f8d7da',
+}
+
+# input-parsing patterns, compiled once
+STOCK_DATE_RE = re.compile(r'\((.*?)\)')
+WEIGHT_KG_RE = re.compile(r'([\d.]+)\s*kg')
+THICKNESS_MM_RE = re.compile(r'([\d.]+)\s*mm')
+SIZE_RE = re.compile(r'(\d+\.?\d*)\s*[xX]\s*(\d+\.?\d*)')
+UNIT_TOKEN_RE = re.compile(r'^[\d\.]+(kg|mm)$')
+NUMBER_RE = re.compile(r'[\d.]+')
 
 # -------------------------
 # Helpers
 # -------------------------
-def find_latest_stock_file(pattern="Stocks(*).xlsx"):
-    files = glob.glob(os.path.join(DATA_FOLDER, "Stocks(*).xlsx"))
-    if not files:
+def stock_file_date(path):
+    """Date encoded in a `Stocks(DD-MM-YYYY).xlsx` file name, or None if it doesn't parse."""
+    m = STOCK_DATE_RE.search(os.path.basename(path))
+    if not m:
+        return None
+    for fmt in ("%d-%m-%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(m.group(1).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+@st.cache_data(show_spinner=False)
+def find_latest_stock_file(folder_mtime, pattern="Stocks(*).xlsx"):
+    """
+    Latest stock file, picked by the date in its name (no per-file stat).
+    Cached on the data folder's mtime, so it is only recomputed when a file is added/removed/renamed.
+    Falls back to file mtime if any name doesn't carry a parseable date.
+    """
+    # one directory scan; the mtime fallback reuses each DirEntry's stat instead of a stat per path
+    with os.scandir(DATA_FOLDER) as it:
+        entries = [e for e in it if fnmatch.fnmatch(e.name, pattern)]
+    if not entries:
         return None
-    return max(files, key=os.path.getmtime)
+    dated = [(stock_file_date(e.path), e.path) for e in entries]
+    if all(d is not None for d, _ in dated):
+        return max(dated)[1]
+    return max(entries, key=lambda e: e.stat().st_mtime).path
+
+def has_header(col):
+    """usecols filter for read_excel: keep columns whose header cell isn't blank."""
+    return not str(col).startswith("Unnamed:")
+
+# The loaded/derived frames below are cached as resources: every rerun gets the same in-process
+# object instead of an unpickled copy (st.cache_data), so callers must treat them as read-only.
+# max_entries keeps only the current file versions (plus the previous one while it's replaced).
+@st.cache_resource(show_spinner=False, max_entries=4)
+def read_sheet(path, mtime):
+    """
+    Read an .xlsx or .parquet sheet once per file version; `mtime` is only the cache key.
+    Parquet columns come back Arrow-backed; column names are stripped of surrounding whitespace.
+    """
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, dtype_backend="pyarrow")
+    else:
+        # only the first sheet, and columns without a header (blank trailing cells Excel keeps
+        # formatted) are skipped by the reader instead of being materialized and ignored later.
+        # Default dtypes, not the Arrow backend: hand-kept sheets have text placeholders like `-`
+        # in numeric columns, which Arrow refuses to convert; build_merged coerces those to NaN/0
+        # and category_search_keys converts the label columns to Arrow strings itself.
+        df = pd.read_excel(path, engine=EXCEL_ENGINE, sheet_name=0, usecols=has_header)
+    # normalized here, on the freshly read frame, since the cached object is shared afterwards
+    df.columns = df.columns.astype(str).str.strip()
+    return df
+
+def read_pipe_mass(xlsx_mtime, xlsx_size):
+    """
+    Read the fixed mass sheet, preferring the Parquet copy when it was built from this exact xlsx
+    (recorded mtime and size match; a copied-in xlsx can carry an older mtime). Returns (df, path read).
+    """
+    try:
+        source = json.loads(pq.read_schema(PIPE_MASS_PARQUET).metadata[PIPE_MASS_SOURCE_KEY])
+        parquet_mtime = os.path.getmtime(PIPE_MASS_PARQUET)
+    except (OSError, ValueError, KeyError, TypeError):  # no copy, unreadable, or built without the stamp
+        source = None
+    if source == {"mtime": xlsx_mtime, "size": xlsx_size}:
+        return read_sheet(PIPE_MASS_PARQUET, parquet_mtime), PIPE_MASS_PARQUET
+    return read_sheet(PIPE_MASS_FILE, xlsx_mtime), PIPE_MASS_FILE
+
+def thickness_by_col(cols):
+    """{column header: thickness in mm} parsed from the first number in each header (NaN if none)."""
+    # all headers in one vectorized extract with the module-level pattern, no per-name Python loop
+    mm = pd.to_numeric(pd.Index(cols).astype(str).str.extract(f"({NUMBER_RE.pattern})", expand=False), errors="coerce")
+    return dict(zip(cols, mm))
 
 def find_col_by_substring(df, substr_list):
     """Return first column name that contains any substring in substr_list (case-insensitive)."""
-    cols = list(df.columns)
+    lowered = df.columns.astype(str).str.lower()
     for s in substr_list:
-        for c in cols:
-            if s.lower() in str(c).lower():
-                return c
+        hits = np.flatnonzero(lowered.str.contains(s.lower(), regex=False))
+        if len(hits):
+            return df.columns[hits[0]]
     return None
 
 def safe_float(x, default=None):
@@ -48,56 +147,41 @@ def parse_free_text(text):
     # remove commas
     s = s.replace(",", " ")
     # extract weight like '12kg' or '12 kg' or standalone number with kg assumption later
-    m = re.search(r'([\d.]+)\s*kg', s)
+    m = WEIGHT_KG_RE.search(s)
     if m:
         out["weight_kg"] = safe_float(m.group(1))
-        s = re.sub(m.group(0), " ", s)
+        s = s.replace(m.group(0), " ")
     else:
         # maybe number followed by mm
-        m2 = re.search(r'([\d.]+)\s*mm', s)
+        m2 = THICKNESS_MM_RE.search(s)
         if m2:
             out["thickness_mm"] = safe_float(m2.group(1))
-            s = re.sub(m2.group(0), " ", s)
+            s = s.replace(m2.group(0), " ")
         else:
             # maybe a bare weight number present (ambiguous) - don't assume
             pass
 
     # Try to find 'X' or 'x' size patterns like 100x100, 2x2
-    m3 = re.search(r'(\d+\.?\d*)\s*[xX]\s*(\d+\.?\d*)', s)
+    m3 = SIZE_RE.search(s)
     if m3:
         out["category"] = f"{m3.group(1)}x{m3.group(2)}"
         # remove it
-        s = re.sub(m3.group(0), " ", s)
+        s = s.replace(m3.group(0), " ")
     else:
         # fallback: first token that's not weight or mm
-        tokens = [t for t in re.split(r'\s+', s) if t.strip()]
+        tokens = s.split()
         for t in tokens:
-            if re.match(r'^[\d\.]+(kg|mm)$', t):
+            if UNIT_TOKEN_RE.match(t):
                 continue
             out["category"] = t
             break
     return out
 
-def availability_label(row, qty_required):
-    try:
-        no_of_pipes = float(row.get("No_of_Pipes_in_Stock", 0))
-    except Exception:
-        no_of_pipes = 0
-    if no_of_pipes >= qty_required:
-        return "✅ Available"
-    if 0 < no_of_pipes < qty_required:
-        return "⚠️ Low Stock"
-    return "❌ Not Available"
-
-def style_rows(df):
-    def _color(row):
-        status = row.get("Availability_Status", "")
-        if status == "✅ Available":
-            return ['background-color: #d4edda']*len(row)
-        if status == "⚠️ Low Stock":
-            return ['background-color: #fff3cd']*len(row)
-        return ['background-color: #f8d7da']*len(row)
-    return df.style.apply(_color, axis=1)
+def style_rows(df, status_col="Availability"):
+    """Colour whole rows by availability; one dict lookup per status, then a single Styler call for the grid."""
+    colors = df[status_col].map(AVAILABILITY_STYLES).fillna(AVAILABILITY_STYLES["❌ Not Available"]).to_numpy()
+    styles = np.repeat(colors[:, None], df.shape[1], axis=1)
+    return df.style.apply(lambda _: styles, axis=None)
 
 # -------------------------
 # Load data safely
@@ -105,32 +189,37 @@ def style_rows(df):
 st.title("📊 Pipe Stock Search Tool")
 st.markdown("Automated daily stock → pipe search. `pipe_mass.xlsx` (fixed) & latest `Stocks(...).xlsx` from `data/` folder.")
 
-if not os.path.exists(PIPE_MASS_FILE):
+# each input is stat'ed once per rerun; the (path, mtime) pairs key every cache below
+try:
+    mass_stat = os.stat(PIPE_MASS_FILE)
+    mass_key = (PIPE_MASS_FILE, mass_stat.st_mtime)
+except OSError:
     st.error(f"Missing fixed file: `{PIPE_MASS_FILE}`. Upload `pipe_mass.xlsx` to the data folder.")
     st.stop()
 
-latest_stock = find_latest_stock_file()
+try:
+    latest_stock = find_latest_stock_file(os.path.getmtime(DATA_FOLDER))
+except OSError:  # no data folder at all
+    latest_stock = None
 if not latest_stock:
     st.error(f"No stock file found in `{DATA_FOLDER}`. Upload one like `Stocks(DD-MM-YYYY).xlsx`.")
     st.stop()
+stock_key = (latest_stock, os.path.getmtime(latest_stock))
 
 # Read files
 try:
-    df_mass = pd.read_excel(PIPE_MASS_FILE)
+    df_mass, mass_source = read_pipe_mass(mass_stat.st_mtime, mass_stat.st_size)
+    mass_key += (mass_stat.st_size, mass_source)  # caches below also tell the xlsx and Parquet reads apart
 except Exception as e:
     st.error(f"Error reading pipe mass file: {e}")
     st.stop()
 
 try:
-    df_stock = pd.read_excel(latest_stock)
+    df_stock = read_sheet(*stock_key)
 except Exception as e:
     st.error(f"Error reading latest stock file `{os.path.basename(latest_stock)}`: {e}")
     st.stop()
 
-# Normalize column whitespace
-df_mass.columns = df_mass.columns.astype(str).str.strip()
-df_stock.columns = df_stock.columns.astype(str).str.strip()
-
 # -------------------------
 # Identify column names (robust)
 # -------------------------
@@ -144,59 +233,152 @@ stock_cat_col = find_col_by_substring(df_stock, ["pipe category (mm", "pipe cate
 stock_thickness_cols = list(df_stock.columns[2:])
 
 # -------------------------
-# Melt mass -> long
+# Build the long (category, thickness) frame — independent of the search inputs, so it is
+# cached per file version in memory and persisted as Parquet under data/.cache
 # -------------------------
-df_mass_long = df_mass.melt(
-    id_vars=[mass_cat_col],
-    value_vars=mass_thickness_cols,
-    var_name="Thickness_mm",
-    value_name="Mass_kg"
-)
-
-# normalize thickness column values: extract numeric
-df_mass_long["Thickness_mm"] = df_mass_long["Thickness_mm"].astype(str).str.extract(r'([\d.]+)', expand=False)
-df_mass_long["Thickness_mm"] = pd.to_numeric(df_mass_long["Thickness_mm"], errors='coerce')
-df_mass_long["Mass_kg"] = pd.to_numeric(df_mass_long["Mass_kg"], errors='coerce')
-
-# unify category column name to a common name for merge
-df_mass_long = df_mass_long.rename(columns={mass_cat_col: "Pipe Category (mm / NB / OD)"})
-
-# -------------------------
-# Melt stock -> long
-# -------------------------
-df_stock_long = df_stock.melt(
-    id_vars=[stock_inch_col, stock_cat_col],
-    value_vars=stock_thickness_cols,
-    var_name="Thickness_mm",
-    value_name="Stock_MT"
-)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def build_merged(_df_stock, _df_mass, stock_key, mass_key):
+    """Melt stock + mass sheets and attach mass to each stock row. `stock_key`/`mass_key` identify the files read (cache keys)."""
+    digest = hashlib.sha1(repr((MERGED_CACHE_VERSION, stock_key, mass_key)).encode()).hexdigest()[:16]
+    cache_path = os.path.join(MERGED_CACHE_FOLDER, f"merged_{digest}.parquet")
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except (OSError, ValueError):  # unreadable/corrupt copy: discard it and rebuild
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    # Melt mass -> long
+    df_mass_long = _df_mass.melt(
+        id_vars=[mass_cat_col],
+        value_vars=mass_thickness_cols,
+        var_name="Thickness_mm",
+        value_name="Mass_kg"
+    )
+
+    # normalize thickness column values: parse each header once, then map the melted labels
+    df_mass_long["Thickness_mm"] = df_mass_long["Thickness_mm"].map(thickness_by_col(mass_thickness_cols)).astype("float64")
+    df_mass_long["Mass_kg"] = pd.to_numeric(df_mass_long["Mass_kg"], errors='coerce')
+
+    # unify category column name to a common name for merge
+    df_mass_long = df_mass_long.rename(columns={mass_cat_col: "Pipe Category (mm / NB / OD)"})
+    # blank rows in the sheet have no category and nothing to look up; drop them so they can't
+    # show up as duplicate (NaN, thickness) keys below
+    df_mass_long = df_mass_long.dropna(subset=["Pipe Category (mm / NB / OD)"])
+
+    # Melt stock -> long
+    df_stock_long = _df_stock.melt(
+        id_vars=[stock_inch_col, stock_cat_col],
+        value_vars=stock_thickness_cols,
+        var_name="Thickness_mm",
+        value_name="Stock_MT",
+        ignore_index=False
+    ).reset_index(names="Stock_Row")  # source row in df_stock, used by the category filter
+
+    df_stock_long["Thickness_mm"] = df_stock_long["Thickness_mm"].map(thickness_by_col(stock_thickness_cols)).astype("float64")
+    df_stock_long["Stock_MT"] = pd.to_numeric(df_stock_long["Stock_MT"], errors='coerce').fillna(0)
+
+    # normalize column names
+    df_stock_long = df_stock_long.rename(columns={stock_inch_col: "Pipe Category (Inches)", stock_cat_col: "Pipe Category (mm / NB / OD)"})
+
+    # Look up mass for each stock row
+    # keyed (category, thickness) -> mass lookup built once; each stock row is a hash probe
+    # (sorted so the MultiIndex is monotonic and reindex can use its sorted-index engine)
+    mass_key_cols = ["Pipe Category (mm / NB / OD)", "Thickness_mm"]
+    # labels repeat once per thickness after the melt; one shared categorical dtype on both sides
+    # stores each label once and lets the key index compare integer codes
+    cat_dtype = pd.CategoricalDtype(pd.concat([
+        df_mass_long["Pipe Category (mm / NB / OD)"], df_stock_long["Pipe Category (mm / NB / OD)"]
+    ]).dropna().unique())
+    df_mass_long["Pipe Category (mm / NB / OD)"] = df_mass_long["Pipe Category (mm / NB / OD)"].astype(cat_dtype)
+    df_stock_long = df_stock_long.astype({"Pipe Category (mm / NB / OD)": cat_dtype, "Pipe Category (Inches)": "category"})
+    mass_lookup = df_mass_long.set_index(mass_key_cols)["Mass_kg"].sort_index()
+    # the lookup must be many-to-one: a category listed twice in pipe_mass would make the mass ambiguous
+    dup = mass_lookup.index.duplicated(keep=False)
+    if dup.any():
+        cats = sorted({str(c) for c in mass_lookup.index[dup].get_level_values(0)})
+        raise ValueError(f"`{os.path.basename(PIPE_MASS_FILE)}` lists these categories more than once: {', '.join(cats)}")
+    stock_keys = pd.MultiIndex.from_frame(df_stock_long[mass_key_cols])
+
+    df = df_stock_long.assign(Mass_kg=mass_lookup.reindex(stock_keys).to_numpy())
+
+    # source values carry 3–4 significant digits; float32 halves the frame the filters scan
+    # (Stock_Row only indexes df_stock, so int32 is plenty)
+    df = df.astype({"Thickness_mm": "float32", "Stock_MT": "float32", "Mass_kg": "float32", "Stock_Row": "int32"})
+
+    # pipe count and stock weight don't depend on the search inputs, so they're computed once
+    # here next to the mass lookup. Mass_kg may be NaN — treat as not available / N/A.
+    # No_of_Pipes_in_Stock: avoid division by zero and NaN mass — quotient is only
+    # computed where mass > 0 (NaN compares False), every other row stays 0
+    stock_kg = df["Stock_MT"].to_numpy(dtype=float) * 1000.0
+    mass_kg = df["Mass_kg"].to_numpy(dtype=float)
+    no_pipes = np.zeros_like(stock_kg)
+    np.divide(stock_kg, mass_kg, out=no_pipes, where=mass_kg > 0)
+    np.rint(no_pipes, out=no_pipes)
+    df = df.assign(
+        No_of_Pipes_in_Stock=no_pipes.astype(np.int32),
+        Total_Weight_in_Stock_kg=no_pipes * np.nan_to_num(mass_kg),
+    )
+
+    # sorted by thickness once so the thickness filter is a binary search + slice (stable keeps sheet order within a thickness)
+    df = df.sort_values("Thickness_mm", kind="stable").reset_index(drop=True)
+
+    # written to a temp file and renamed into place, so readers never see a partial file
+    tmp_path = None
+    try:
+        os.makedirs(MERGED_CACHE_FOLDER, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=MERGED_CACHE_FOLDER, prefix="merged_", suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return df  # read-only data folder: keep the in-memory cache only
+    # only the current file versions are ever looked up again, so drop the older copies
+    # (and temp files left by killed writes)
+    with os.scandir(MERGED_CACHE_FOLDER) as it:
+        stale = [e.path for e in it if fnmatch.fnmatch(e.name, "merged_*") and e.path != cache_path]
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # already gone (another session pruned it) or not removable; retried next build
+    return df
 
-df_stock_long["Thickness_mm"] = df_stock_long["Thickness_mm"].astype(str).str.extract(r'([\d.]+)', expand=False)
-df_stock_long["Thickness_mm"] = pd.to_numeric(df_stock_long["Thickness_mm"], errors='coerce')
-df_stock_long["Stock_MT"] = pd.to_numeric(df_stock_long["Stock_MT"], errors='coerce').fillna(0)
+try:
+    df = build_merged(df_stock, df_mass, stock_key, mass_key)
+except ValueError as e:
+    st.error(f"Error matching stock to pipe masses: {e}")
+    st.stop()
 
-# normalize column names
-df_stock_long = df_stock_long.rename(columns={stock_inch_col: "Pipe Category (Inches)", stock_cat_col: "Pipe Category (mm / NB / OD)"})
+@st.cache_resource(show_spinner=False, max_entries=2)
+def category_search_keys(_df_stock, stock_key):
+    """Per stock row: inch and mm/NB/OD labels as Arrow strings, lower-cased with spaces removed (blank cells -> "")."""
+    keys = _df_stock[[stock_inch_col, stock_cat_col]].astype("string[pyarrow]")
+    keys = keys.apply(lambda c: c.str.lower().str.replace(" ", "", regex=False).fillna(""))
+    keys.columns = ["inch", "mmnb"]
+    return keys
 
-# -------------------------
-# Merge mass with stock
-# -------------------------
-df = pd.merge(
-    df_stock_long,
-    df_mass_long,
-    on=["Pipe Category (mm / NB / OD)", "Thickness_mm"],
-    how="left"
-)
+category_keys = category_search_keys(df_stock, stock_key)
 
 # -------------------------
 # UI: Filters
 # -------------------------
 st.sidebar.header("Search Filters")
-pipe_category_input = st.sidebar.text_input("Pipe Category (inch/mm/NB/OD) — free text or exact e.g. 100x100 or 4\" or 50 NB")
-free_text_input = st.sidebar.text_input("Free text (eg. '40x40 12kg' or '20x20 1.6mm') — optional")
-thickness_input = st.sidebar.text_input("Thickness (mm) or range like 1.2-2.5 (optional)")
-weight_input = st.sidebar.text_input("Weight (kg) - exact or approximate (optional)")
-quantity_required = st.sidebar.number_input("Quantity required (pieces)", min_value=1, value=1, step=1)
+# all inputs live in a form so typing/stepping doesn't rerun the search until Search is pressed
+with st.sidebar.form("filters", clear_on_submit=False):
+    pipe_category_input = st.text_input("Pipe Category (inch/mm/NB/OD) — free text or exact e.g. 100x100 or 4\" or 50 NB")
+    free_text_input = st.text_input("Free text (eg. '40x40 12kg' or '20x20 1.6mm') — optional")
+    thickness_input = st.text_input("Thickness (mm) or range like 1.2-2.5 (optional)")
+    weight_input = st.text_input("Weight (kg) - exact or approximate (optional)")
+    quantity_required = st.number_input("Quantity required (pieces)", min_value=1, value=1, step=1)
+    st.form_submit_button("Search")
 
 st.sidebar.markdown("---")
 if st.sidebar.button("Clear filters"):
@@ -212,90 +394,107 @@ if parsed["thickness_mm"] and not thickness_input:
     thickness_input = str(parsed["thickness_mm"])
 
 # -------------------------
-# Apply filters progressively
-# -------------------------
-df_filtered = df.copy()
-
-# Pipe category match (ignore spaces/case)
-if pipe_category_input and str(pipe_category_input).strip():
-    search = str(pipe_category_input).strip().lower().replace(" ", "")
-    mask_inch = df_filtered["Pipe Category (Inches)"].astype(str).str.lower().str.replace(" ", "").str.contains(search, na=False)
-    mask_mmnb = df_filtered["Pipe Category (mm / NB / OD)"].astype(str).str.lower().str.replace(" ", "").str.contains(search, na=False)
-    df_filtered = df_filtered[mask_inch | mask_mmnb]
-
-# Thickness filter
-if thickness_input and str(thickness_input).strip():
-    try:
-        t_input = str(thickness_input).strip()
-        if "-" in t_input:
-            parts = [p.strip() for p in t_input.split("-")]
-            tmin = float(parts[0]); tmax = float(parts[1])
-            df_filtered = df_filtered[(df_filtered["Thickness_mm"] >= tmin) & (df_filtered["Thickness_mm"] <= tmax)]
-        else:
-            tval = float(t_input)
-            df_filtered = df_filtered[df_filtered["Thickness_mm"] == tval]
-    except Exception:
-        st.sidebar.warning("Thickness input invalid. Use single value like `1.6` or range `1.2-2.5`.")
-
-# Weight filter (approximate match allowed)
-if weight_input and str(weight_input).strip():
-    try:
-        wval = float(re.findall(r'[\d.]+', str(weight_input))[0])
-        # tolerance ±0.5 kg
-        tol = 0.5
-        df_filtered = df_filtered[(df_filtered["Mass_kg"].notna()) & ((df_filtered["Mass_kg"] - wval).abs() <= tol)]
-    except Exception:
-        st.sidebar.warning("Weight input invalid. Enter numeric (e.g. 12 or 12.5).")
-
-# -------------------------
-# Calculations & availability
+# Search: filters + calculations, re-run only when the submitted inputs change
 # -------------------------
-# Mass_kg may be NaN — treat as not available / N/A
-df_filtered["Mass_kg"] = pd.to_numeric(df_filtered["Mass_kg"], errors="coerce")
-df_filtered["Stock_MT"] = pd.to_numeric(df_filtered["Stock_MT"], errors="coerce").fillna(0)
-
-# No_of_Pipes_in_Stock: avoid division by zero and NaN mass
-def calc_no_pipes(row):
-    mass = row["Mass_kg"]
-    stock = row["Stock_MT"]
-    if pd.isna(mass) or mass == 0:
-        return 0.0
-    return (stock * 1000.0) / mass
-
-df_filtered["No_of_Pipes_in_Stock"] = df_filtered.apply(calc_no_pipes, axis=1)
-df_filtered["No_of_Pipes_in_Stock"] = df_filtered["No_of_Pipes_in_Stock"].fillna(0).round(0).astype(int)
-
-df_filtered["Total_Weight_in_Stock_kg"] = df_filtered["No_of_Pipes_in_Stock"] * df_filtered["Mass_kg"].fillna(0)
-df_filtered["Total_Weight_Required_kg"] = df_filtered["Mass_kg"].fillna(0) * quantity_required
-
-df_filtered["Availability_Status"] = df_filtered.apply(lambda r: availability_label(r, quantity_required), axis=1)
-
-# Create display table
-display_cols = [
-    "Pipe Category (Inches)",
-    "Pipe Category (mm / NB / OD)",
-    "Thickness_mm",
-    "Mass_kg",
-    "Stock_MT",
-    "No_of_Pipes_in_Stock",
-    "Total_Weight_in_Stock_kg",
-    "Total_Weight_Required_kg",
-    "Availability_Status"
-]
-display_df = df_filtered[display_cols].copy()
-
-# Format nicely
-display_df = display_df.rename(columns={
-    "Pipe Category (Inches)": "Category (inches)",
-    "Pipe Category (mm / NB / OD)": "Category (mm/NB/OD)",
-    "Thickness_mm": "Thickness (mm)",
-    "Mass_kg": "Mass per pipe (kg)",
-    "Stock_MT": "Stock (MT)",
-    "No_of_Pipes_in_Stock": "No. of Pipes in Stock",
-    "Total_Weight_in_Stock_kg": "Total Stock Weight (kg)",
-    "Total_Weight_Required_kg": "Required Weight (kg)",
-    "Availability_Status": "Availability"
-})
+def search_stock(pipe_category_input, thickness_input, weight_input, quantity_required):
+    """Filtered display table plus a list of input warnings (shown by the caller on every rerun)."""
+    warnings = []
+    # Apply filters (one combined mask, single selection)
+    mask = np.ones(len(df), dtype=bool)
+
+    # Pipe category match (ignore spaces/case) — evaluated on the wide stock sheet (one row per
+    # category) and broadcast to every thickness row through Stock_Row
+    if pipe_category_input and str(pipe_category_input).strip():
+        search = str(pipe_category_input).strip().lower().replace(" ", "")
+        # plain substring match (regex=False): no regex compile, and inputs like `4"` or `(` are taken literally
+        mask_inch = category_keys["inch"].str.contains(search, regex=False)
+        mask_mmnb = category_keys["mmnb"].str.contains(search, regex=False)
+        # Stock_Row is the positional row of df_stock, so broadcasting is a plain array take
+        mask &= (mask_inch | mask_mmnb).to_numpy(dtype=bool)[df["Stock_Row"].to_numpy()]
+
+    # Thickness filter — df is sorted by thickness, so locate the matching slice with searchsorted
+    if thickness_input and str(thickness_input).strip():
+        # single value or `lo-hi`; partition splits once, without building a list of parts
+        lo_s, sep, hi_s = str(thickness_input).strip().partition("-")
+        try:
+            # compare in the column's float32 so e.g. 1.6 matches the stored 1.6
+            tmin = np.float32(lo_s.strip())
+            tmax = np.float32(hi_s.strip()) if sep else tmin
+            thk = df["Thickness_mm"].to_numpy()
+            mask[:np.searchsorted(thk, tmin, side="left")] = False
+            mask[np.searchsorted(thk, tmax, side="right"):] = False
+        except ValueError:
+            warnings.append("Thickness input invalid. Use single value like `1.6` or range `1.2-2.5`.")
+
+    # Weight filter (approximate match allowed)
+    if weight_input and str(weight_input).strip():
+        try:
+            wval = float(NUMBER_RE.findall(str(weight_input))[0])
+            # tolerance ±0.5 kg
+            tol = 0.5
+            # one pass; missing masses (NaN) never compare close
+            mask &= np.isclose(df["Mass_kg"].to_numpy(), wval, rtol=0, atol=tol)
+        except (ValueError, IndexError):  # unparseable number / no digits at all
+            warnings.append("Weight input invalid. Enter numeric (e.g. 12 or 12.5).")
+
+    # boolean selection already yields a new frame, so no df.copy() is needed anywhere below
+    df_filtered = df.loc[mask]
+
+    # Calculations & availability (pipe count and stock weight come precomputed from build_merged)
+    n = df_filtered["No_of_Pipes_in_Stock"].to_numpy()
+    df_filtered = df_filtered.assign(
+        Total_Weight_Required_kg=np.nan_to_num(df_filtered["Mass_kg"].to_numpy()) * quantity_required,
+        Availability_Status=np.select(
+            [n >= quantity_required, n > 0],
+            ["✅ Available", "⚠️ Low Stock"],
+            default="❌ Not Available"
+        )
+    )
+
+    # Create display table
+    display_cols = [
+        "Pipe Category (Inches)",
+        "Pipe Category (mm / NB / OD)",
+        "Thickness_mm",
+        "Mass_kg",
+        "Stock_MT",
+        "No_of_Pipes_in_Stock",
+        "Total_Weight_in_Stock_kg",
+        "Total_Weight_Required_kg",
+        "Availability_Status"
+    ]
+    display_df = df_filtered[display_cols]
+
+    # Format nicely
+    display_df = display_df.rename(columns={
+        "Pipe Category (Inches)": "Category (inches)",
+        "Pipe Category (mm / NB / OD)": "Category (mm/NB/OD)",
+        "Thickness_mm": "Thickness (mm)",
+        "Mass_kg": "Mass per pipe (kg)",
+        "Stock_MT": "Stock (MT)",
+        "No_of_Pipes_in_Stock": "No. of Pipes in Stock",
+        "Total_Weight_in_Stock_kg": "Total Stock Weight (kg)",
+        "Total_Weight_Required_kg": "Required Weight (kg)",
+        "Availability_Status": "Availability"
+    })
+    return display_df, warnings
+
+search_key = (stock_key, mass_key, pipe_category_input, thickness_input, weight_input, quantity_required)
+if st.session_state.get("search_key") != search_key:
+    results, warnings = search_stock(pipe_category_input, thickness_input, weight_input, quantity_required)
+    st.session_state["search_results"] = results
+    st.session_state["search_warnings"] = warnings
+    # the rendered artifacts depend only on the results, so they're built here once per search
+    # and reused on reruns that don't change the inputs: highlighted rows (very large results skip
+    # the Styler and are sent as plain Arrow data; the Availability column still carries the icon)
+    # and the CSV download bytes
+    st.session_state["search_view"] = style_rows(results) if len(results) <= STYLE_MAX_ROWS else results
+    st.session_state["search_csv"] = results.to_csv(index=False).encode('utf-8')
+    st.session_state["search_key"] = search_key
+display_df = st.session_state["search_results"]
+# stored with the results, so an ignored filter stays explained on reruns that reuse them
+for msg in st.session_state["search_warnings"]:
+    st.sidebar.warning(msg)
 
 # -------------------------
 # Show UI
@@ -307,9 +506,8 @@ with left:
     if display_df.empty:
         st.warning("No matching results. Try fewer filters or check spelling/format.")
     else:
-        # Highlight rows by availability
-        styled = style_rows(display_df)
-        st.dataframe(styled, height=600)
+        # Highlight rows by availability (view prepared with the search results above)
+        st.dataframe(st.session_state["search_view"], height=600)
 
 with right:
     st.subheader("Filters summary")
@@ -335,8 +533,7 @@ with right:
 # Allow download of filtered results (if any)
 # -------------------------
 if not display_df.empty:
-    csv = display_df.to_csv(index=False).encode('utf-8')
-    st.download_button("⬇️ Download search results (CSV)", data=csv, file_name="pipe_stock_search_results.csv", mime="text/csv")
+    st.download_button("⬇️ Download search results (CSV)", data=st.session_state["search_csv"], file_name="pipe_stock_search_results.csv", mime="text/csv")
 
 # Footer / notes
 st.markdown("---")
@@ -0,0 +1,44 @@
+# scripts/build_pipe_mass.py
+"""
+One-shot conversion of the fixed `data/pipe_mass.xlsx` sheet to `data/pipe_mass.parquet`.
+
+The Parquet records the mtime and size of the xlsx it was built from, and the Streamlit app
+only reads it while pipe_mass.xlsx still matches, so the slow XLSX parse is moved out of the
+request path without ever serving stale masses. Re-run after editing pipe_mass.xlsx:
+
+    python scripts/build_pipe_mass.py
+"""
+import json
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+PIPE_MASS_FILE = os.path.join(DATA_FOLDER, "pipe_mass.xlsx")
+PIPE_MASS_PARQUET = os.path.join(DATA_FOLDER, "pipe_mass.parquet")
+SOURCE_META_KEY = b"pipe_mass_source"  # same key as app.PIPE_MASS_SOURCE_KEY
+
+
+def build(src=PIPE_MASS_FILE, dst=PIPE_MASS_PARQUET):
+    src_stat = os.stat(src)
+    # same column filter as app.read_sheet: drop columns with a blank header cell
+    df = pd.read_excel(src, sheet_name=0, usecols=lambda c: not str(c).startswith("Unnamed:"))
+    # thickness headers come back as floats/ints; parquet needs string column names
+    df.columns = df.columns.astype(str)
+    # text placeholders such as `-` in mass cells become NaN, as app.build_merged does for the xlsx
+    mass_cols = df.columns[1:]
+    df[mass_cols] = df[mass_cols].apply(pd.to_numeric, errors="coerce")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    source = json.dumps({"mtime": src_stat.st_mtime, "size": src_stat.st_size}).encode()
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_META_KEY: source})
+    pq.write_table(table, dst, compression="zstd")
+    return dst
+
+
+if __name__ == "__main__":
+    if not os.path.exists(PIPE_MASS_FILE):
+        sys.exit(f"Missing {PIPE_MASS_FILE}")
+    print(f"Wrote {build()}")
@@ -0,0 +1,165 @@
+# tests/test_app.py
+"""End-to-end checks of app.py against edited copies of the sample data in `data/`."""
+import glob
+import os
+import shutil
+import sys
+
+import openpyxl
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, "scripts"))
+import build_pipe_mass  # noqa: E402
+
+STOCK_FILE = "Stocks(09-09-2025).xlsx"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A copy of app.py + the xlsx inputs in a temp folder, which becomes the working directory."""
+    shutil.copy(os.path.join(REPO, "app.py"), tmp_path)
+    (tmp_path / "data").mkdir()
+    for f in glob.glob(os.path.join(REPO, "data", "*.xlsx")):
+        shutil.copy(f, tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()  # the app's caches are keyed on relative paths, shared by all tests
+    return tmp_path
+
+
+def edit_sheet(path, edit):
+    wb = openpyxl.load_workbook(path)
+    edit(wb.active)
+    wb.save(path)
+
+
+def build_mass_parquet(workdir):
+    data = workdir / "data"
+    build_pipe_mass.build(str(data / "pipe_mass.xlsx"), str(data / "pipe_mass.parquet"))
+
+
+def keep_mtime(path, edit):
+    """Apply `edit` to the file, then restore its mtime (like `cp -p` / `rsync -a` of an edited copy)."""
+    stat = os.stat(path)
+    edit()
+    os.utime(path, (stat.st_atime, stat.st_mtime))
+
+
+def mass_for(at, category, thickness):
+    at.sidebar.text_input[0].set_value(category)
+    at.sidebar.text_input[2].set_value(str(thickness))
+    next(b for b in at.button if b.label == "Search").click().run()
+    return at.dataframe[0].value["Mass per pipe (kg)"].iloc[0]
+
+
+def run_app(workdir):
+    at = AppTest.from_file(str(workdir / "app.py"), default_timeout=60)
+    return at.run()
+
+
+def test_text_placeholder_in_stock_column_reads_as_zero(workdir):
+    def put_dashes(ws):
+        ws["R10"] = "-"  # 7.00 mm column
+        ws["E10"] = "-"  # 1.80 mm column
+    edit_sheet(workdir / "data" / STOCK_FILE, put_dashes)
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    assert not at.error
+    results = at.dataframe[0].value
+    row = results[(results["Category (mm/NB/OD)"] == "30x20 mm") & (results["Thickness (mm)"] == 7.0)]
+    assert len(row) == 1
+    assert row["Stock (MT)"].iloc[0] == 0
+
+
+def test_blank_rows_in_pipe_mass_are_ignored(workdir):
+    edit_sheet(workdir / "data" / "pipe_mass.xlsx", lambda ws: ws.insert_rows(11, amount=2))
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    assert not at.error
+    assert len(at.dataframe[0].value) == 816
+
+
+def test_duplicate_category_in_pipe_mass_is_reported(workdir):
+    def duplicate_row(ws):
+        ws.append([c.value for c in ws[3]])
+    edit_sheet(workdir / "data" / "pipe_mass.xlsx", duplicate_row)
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    assert len(at.error) == 1
+    assert "more than once: 20 NB" in at.error[0].value
+
+
+def test_invalid_input_warning_survives_reruns(workdir):
+    at = run_app(workdir)
+    at.sidebar.text_input[2].set_value("abc")  # thickness
+    at.sidebar.text_input[3].set_value("kg")  # weight
+    next(b for b in at.button if b.label == "Search").click().run()
+    expected = [
+        "Thickness input invalid. Use single value like `1.6` or range `1.2-2.5`.",
+        "Weight input invalid. Enter numeric (e.g. 12 or 12.5).",
+    ]
+    assert [w.value for w in at.sidebar.warning] == expected
+
+    at.run()  # e.g. after the download button; the cached results are reused
+
+    assert [w.value for w in at.sidebar.warning] == expected
+
+
+def test_merged_cache_keeps_only_the_current_file(workdir):
+    cache = workdir / "data" / ".cache"
+    cache.mkdir()
+    (cache / "merged_0123456789abcdef.parquet").write_bytes(b"old version")
+    (cache / "notes.txt").write_text("not ours")
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    merged = sorted(p.name for p in cache.glob("merged_*.parquet"))
+    assert len(merged) == 1 and merged[0] != "merged_0123456789abcdef.parquet"
+    assert (cache / "notes.txt").exists()
+
+
+def test_corrupt_merged_cache_is_rebuilt(workdir):
+    run_app(workdir)
+    (cached,) = (workdir / "data" / ".cache").glob("merged_*.parquet")
+    cached.write_bytes(cached.read_bytes()[: cached.stat().st_size // 2])  # e.g. a killed write
+    st.cache_resource.clear()  # cold start: only the disk copy is left
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    assert not at.error
+    assert len(at.dataframe[0].value) == 816
+    assert [p.name for p in cached.parent.iterdir()] == [cached.name]
+
+
+def test_mass_parquet_is_used_while_it_matches_the_xlsx(workdir):
+    build_mass_parquet(workdir)
+    xlsx = workdir / "data" / "pipe_mass.xlsx"
+    # same size and mtime, but unreadable: only the Parquet copy can serve the masses
+    keep_mtime(xlsx, lambda: xlsx.write_bytes(b"x" * xlsx.stat().st_size))
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    assert not at.error
+    assert mass_for(at, "20 NB", 1.2) == pytest.approx(4.69116)
+
+
+def test_edited_xlsx_with_old_mtime_wins_over_mass_parquet(workdir):
+    build_mass_parquet(workdir)
+    xlsx = workdir / "data" / "pipe_mass.xlsx"
+    keep_mtime(xlsx, lambda: edit_sheet(xlsx, lambda ws: ws.__setitem__("B3", 99.0)))  # 20 NB @ 1.2 mm
+
+    at = run_app(workdir)
+
+    assert not at.exception
+    assert mass_for(at, "20 NB", 1.2) == 99.0
@@ -0,0 +1,29 @@
+# tests/test_build_pipe_mass.py
+"""scripts/build_pipe_mass.py on edited copies of data/pipe_mass.xlsx."""
+import os
+import shutil
+import sys
+
+import openpyxl
+import pandas as pd
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, "scripts"))
+import build_pipe_mass  # noqa: E402
+
+
+def test_text_placeholder_in_mass_cell_becomes_nan(tmp_path):
+    src = tmp_path / "pipe_mass.xlsx"
+    shutil.copy(os.path.join(REPO, "data", "pipe_mass.xlsx"), src)
+    wb = openpyxl.load_workbook(src)
+    wb.active["C5"] = "-"
+    wb.save(src)
+
+    dst = build_pipe_mass.build(str(src), str(tmp_path / "pipe_mass.parquet"))
+
+    df = pd.read_parquet(dst)
+    expected = pd.read_excel(src)
+    expected.columns = expected.columns.astype(str)
+    expected.iloc[:, 1:] = expected.iloc[:, 1:].apply(pd.to_numeric, errors="coerce")
+    assert pd.isna(df.iloc[3, 2])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
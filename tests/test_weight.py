@@ -0,0 +1,39 @@
+# tests/test_weight.py
+"""weight.create_weight_sheet against the original row-by-row loop it replaced."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import weight  # noqa: E402  (runs the Streamlit page in bare mode with its default inputs)
+
+
+def loop_weight_sheet(strip_widths, thicknesses, length_m=6):
+    """The pre-vectorization create_weight_sheet, kept as the reference."""
+    records = []
+    for w in strip_widths:
+        for t in thicknesses:
+            records.append({
+                "Strip Width (mm)": w,
+                "Thickness (mm)": t,
+                "Length (m)": length_m,
+                "Weight (kg)": round(weight.calculate_pipe_weight(w, t, length_m), 2)
+            })
+    return pd.DataFrame(records)
+
+
+def test_matches_loop_on_a_full_grid():
+    widths = [float(w) for w in range(50, 601)]
+    thicknesses = [round(1.0 + 0.1 * i, 1) for i in range(71)]
+
+    got = weight.create_weight_sheet(widths, thicknesses, 6.0)
+
+    pd.testing.assert_frame_equal(got, loop_weight_sheet(widths, thicknesses, 6.0))
+
+
+@pytest.mark.parametrize("thickness, expected", [(1.5, 7.07), (5.5, 25.91), (6.5, 30.61)])
+def test_rounds_ties_like_python_round(thickness, expected):
+    got = weight.create_weight_sheet([100.0], [thickness], 6.0)
+    assert got["Weight (kg)"].iloc[0] == expected
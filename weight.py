@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import io
 
+# xlsxwriter (optional) writes xlsx noticeably faster than openpyxl
+try:
+    import xlsxwriter  # noqa: F401
+    XLSX_ENGINE = "xlsxwriter"
+except ImportError:
+    XLSX_ENGINE = "openpyxl"
+
 # Density of mild steel (g/cm³) = 7.85 -> 7850 kg/m³
 DENSITY = 7850  
 
@@ -18,19 +26,29 @@ def calculate_pipe_weight(strip_width_mm, thickness_mm, length_m=6):
     mass_kg = DENSITY * volume_m3  
     return mass_kg
 
-# Create weight sheet DataFrame
+# Create weight sheet DataFrame (one row per width × thickness pair, cached on the inputs)
+@st.cache_data(show_spinner=False)
 def create_weight_sheet(strip_widths, thicknesses, length_m=6):
-    records = []
-    for w in strip_widths:
-        for t in thicknesses:
-            weight = calculate_pipe_weight(w, t, length_m)
-            records.append({
-                "Strip Width (mm)": w,
-                "Thickness (mm)": t,
-                "Length (m)": length_m,
-                "Weight (kg)": round(weight, 2)
-            })
-    return pd.DataFrame(records)
+    widths = np.asarray(strip_widths)
+    thick = np.asarray(thicknesses)
+    W, T = np.meshgrid(widths, thick, indexing="ij")
+    # Weights for the whole grid in one broadcast
+    weights = calculate_pipe_weight(widths[:, np.newaxis], thick[np.newaxis, :], length_m)
+    return pd.DataFrame({
+        "Strip Width (mm)": W.ravel(),
+        "Thickness (mm)": T.ravel(),
+        "Length (m)": length_m,
+        # round() per value: np.round differs at .xx5 ties
+        "Weight (kg)": [round(x, 2) for x in weights.ravel().tolist()]
+    })
+
+# Serialize the sheet to xlsx bytes (cached)
+@st.cache_data(show_spinner=False)
+def to_xlsx_bytes(df):
+    output = io.BytesIO()
+    # no constant_memory: pandas writes column by column, which that mode drops
+    df.to_excel(output, index=False, engine=XLSX_ENGINE)
+    return output.getvalue()
 
 # -------------------- Streamlit UI --------------------
 
@@ -42,11 +60,11 @@ length_m = st.sidebar.number_input("Pipe Length (m)", value=6.0, step=0.5)
 strip_widths = st.sidebar.text_input("Enter strip widths (mm, comma separated)", "100, 120, 150")
 thicknesses = st.sidebar.text_input("Enter thicknesses (mm, comma separated)", "1.2, 2.5, 5")
 
-# Convert inputs to lists
+# Convert inputs to float arrays
 try:
-    strip_widths = [float(x.strip()) for x in strip_widths.split(",")]
-    thicknesses = [float(x.strip()) for x in thicknesses.split(",")]
-except:
+    strip_widths = np.array(strip_widths.split(","), dtype=float)
+    thicknesses = np.array(thicknesses.split(","), dtype=float)
+except ValueError:
     st.error("⚠️ Please enter valid numbers for strip widths and thicknesses.")
     st.stop()
 
@@ -56,13 +74,9 @@ result_df = create_weight_sheet(strip_widths, thicknesses, length_m)
 st.dataframe(result_df, use_container_width=True)
 
 # Excel download
-output = io.BytesIO()
-result_df.to_excel(output, index=False, engine="openpyxl")
-output.seek(0)
-
 st.download_button(
     label="📥 Download as Excel",
-    data=output,
+    data=to_xlsx_bytes(result_df),
     file_name="pipe_stock.xlsx",
     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )